@@ -1,7 +1,8 @@
-# Imports OS, logging and environment variables importing components
+# Imports OS and logging components (environment variables are loaded by main.py)
 import os
 import logging
-from dotenv import load_dotenv
+from urllib.parse import urlparse
+from collections import OrderedDict
 
 # Imports the AI components for agent creation
 from langchain.agents import create_agent
@@ -11,23 +12,55 @@ from langgraph.checkpoint.memory import InMemorySaver
 # Imports agent tools
 from tools import (
     get_stock_price, 
+    get_stock_prices_batch,
     get_historical_stock_price,
     get_balance_sheet,
     get_stock_news,
     web_search
 )
 
-# Loads environment variables and configures the logger
-load_dotenv()
+# Configures the logger
 logger = logging.getLogger(__name__)
 
+# === CHECKPOINTER ===
+
+# In-memory checkpointer bounded by thread count
+class BoundedInMemorySaver(InMemorySaver):
+    """In-memory checkpointer that keeps only the most recently used threads.
+
+    Once more than `max_threads` conversations are stored, the least recently
+    updated one is deleted, so memory stays bounded under sustained traffic.
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        super().__init__()
+        self.max_threads = max_threads
+        self._thread_order: OrderedDict[str, None] = OrderedDict()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Stores the checkpoint, marks its thread as recent and evicts the oldest."""
+        result = super().put(config, checkpoint, metadata, new_versions)
+
+        thread_id = config["configurable"]["thread_id"]
+        self._thread_order[thread_id] = None
+        self._thread_order.move_to_end(thread_id)
+
+        while len(self._thread_order) > self.max_threads:
+            oldest_thread_id, _ = self._thread_order.popitem(last=False)
+            self.delete_thread(oldest_thread_id)
+            logger.info("Evicted least recently used conversation thread from memory")
+        return result
+
 # === AGENT ===
 
 # Creates agent via LangChain
-def get_agent():
+def get_agent(system_prompt: str = ""):
     """
     Creates and returns a configured LangChain agent with financial analysis tools.
     Validates required environment variables before initialization.
+
+    The system prompt is bound to the agent, so it is prepended to every model
+    call without being stored in (or duplicated across) the checkpointed thread.
     """
     
     # Validates required environment variables
@@ -40,19 +73,39 @@ def get_agent():
             f"Please check your .env file."
         )
     
+    # OpenAI-only request fields are sent by default only to OpenAI itself,
+    # since compatible endpoints may reject unknown body fields
+    base_url = os.getenv('LLM_BASE_URL', "")
+    is_openai = urlparse(base_url).hostname in (None, "api.openai.com")
+
+    # Routes every request to the same provider prompt cache: the system prompt
+    # and tool schemas are a byte-identical prefix, so OpenAI reuses its cached
+    # KV state once the prefix passes 1024 tokens (other endpoints opt in by
+    # setting the variable; an empty string disables it)
+    prompt_cache_key = os.getenv('LLM_PROMPT_CACHE_KEY', "nexus-financial-agent" if is_openai else "")
+    model_kwargs = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
+
+    # Streamed token usage is requested through stream_options, on the same terms
+    stream_usage = os.getenv('LLM_STREAM_USAGE', "true" if is_openai else "false").lower() == "true"
+
     # Configures AI model
     model = ChatOpenAI(
             model = os.getenv('LLM_NAME', ""),
-            base_url = os.getenv('LLM_BASE_URL',""),
+            base_url = base_url,
+            model_kwargs = model_kwargs,
+            stream_usage = stream_usage, # token usage arrives on the final streamed chunk
         )
     
-    # Initialize an in-memory saver to persist lightweight agent state/checkpoints
-    memory = InMemorySaver()
+    # Initialize a bounded in-memory saver to persist lightweight agent state/checkpoints
+    memory = BoundedInMemorySaver(
+        max_threads=int(os.getenv('CHECKPOINT_MAX_THREADS', "1000"))
+    )
 
     # Register the tool functions that the agent can call for financial data
     # and web searches. These are passed to the LangChain agent on creation.
     tools = [
         get_stock_price, 
+        get_stock_prices_batch,
         get_historical_stock_price, 
         get_balance_sheet, 
         get_stock_news,
@@ -61,4 +114,9 @@ def get_agent():
 
     # Logs the execution and returns agent
     logger.info("Financial analysis agent initialized successfully")
-    return create_agent(model=model, checkpointer=memory,tools=tools)
\ No newline at end of file
+    return create_agent(
+        model=model,
+        checkpointer=memory,
+        tools=tools,
+        system_prompt=system_prompt or None
+    )
\ No newline at end of file
@@ -1,24 +1,30 @@
-# Imports environment variable loading, type casting and logging components
+# Loads environment variables once, before any module that reads them is imported
 from dotenv import load_dotenv
-from typing import AsyncGenerator
+load_dotenv()
+
+# Imports type casting and logging components
+from typing import Any, AsyncGenerator, Optional
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 
 # Imports API and serving components
 import uvicorn
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 # Imports AI components
-from langchain.messages import SystemMessage, HumanMessage
+from langchain.messages import AIMessageChunk, HumanMessage
 from langchain_core.runnables import RunnableConfig
-from agent import get_agent
 
 # Imports data schemas
-from schemas import RequestObject, PromptObject
+from schemas import RequestObject
 
-# Imports prompt loading components
-import tomllib
+# Imports prompt loading components (tomllib is imported only on a prompt cache miss)
+import json
+import os
 from pathlib import Path
 
 # Configure logging to avoid sensitive data
@@ -27,12 +33,63 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Configures logging and loads environment variables
+# Configures the module logger
 logger = logging.getLogger(__name__)
-load_dotenv()
+
+# === AGENT ===
+
+# The agent is built on first use instead of at import time, so server boot
+# (and every --reload cycle) doesn't pay for LangChain/OpenAI initialization
+_agent: Optional[Any] = None
+_agent_lock = asyncio.Lock()
+
+def _build_agent():
+    """Imports the agent module and builds the agent (blocking)."""
+    from agent import get_agent
+    return get_agent(system_message)
+
+async def get_agent_lazy():
+    """Returns the shared agent, building it on the first call.
+
+    Construction runs in a worker thread under a lock, so concurrent first
+    requests build it only once and the event loop keeps serving meanwhile.
+    """
+    global _agent
+    if _agent is None:
+        async with _agent_lock:
+            if _agent is None:
+                _agent = await asyncio.to_thread(_build_agent)
+    return _agent
+
+def _log_warmup_result(task: asyncio.Task) -> None:
+    """Logs agent warm-up failures, which are retried on the first request."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Agent warm-up failed: {task.exception()}")
+
+# Worker threads for blocking tool calls: LangChain runs the sync tools in the
+# event loop's default executor, which otherwise caps at min(32, CPUs + 4)
+# (tools.py sizes its Redis connection pool from the same variable)
+TOOL_WORKERS = int(os.getenv('TOOL_WORKERS', "32"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sizes the tool thread pool and warms the agent in the background."""
+    executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    warmup = asyncio.create_task(get_agent_lazy())
+    warmup.add_done_callback(_log_warmup_result)
+    yield
+    warmup.cancel()
+    executor.shutdown(wait=False, cancel_futures=True)
 
 # Initializes app and configures CORS middleware
-app = FastAPI(title="Nexus Financial Assistant")
+# (routes returning plain data are serialized with orjson instead of stdlib json)
+app = FastAPI(
+    title="Nexus Financial Assistant",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000"],  # Frontend dev servers
@@ -41,21 +98,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initializes AI agent
-agent = get_agent()
+# Streaming and security headers sent with every chat response
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no',
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block'
+}
+
+# === SYSTEM PROMPT ===
 
-# Load system prompt from prompt.toml (open in binary as required by tomllib)
+# prompt.toml is parsed once and the result cached next to it, keyed by the
+# file's mtime and size, so later starts (and --reload cycles) skip TOML parsing
 prompt_path = Path(__file__).resolve().parent / "prompt.toml"
+prompt_cache_path = prompt_path.with_name("prompt.toml.cache")
+
+def _read_prompt_cache(stamp: tuple[int, int]) -> Optional[str]:
+    """Returns the cached system prompt if it matches the (mtime_ns, size) stamp."""
+    try:
+        with prompt_cache_path.open("r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if (cache["mtime_ns"], cache["size"]) == stamp:
+            return cache["prompt"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _write_prompt_cache(stamp: tuple[int, int], message: str) -> None:
+    """Atomically writes the parsed system prompt to the cache file."""
+    tmp_path = prompt_cache_path.with_name(prompt_cache_path.name + ".tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"mtime_ns": stamp[0], "size": stamp[1], "prompt": message}, f)
+        os.replace(tmp_path, prompt_cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write prompt cache: {e}")
+
+# Load system prompt from the cache or from prompt.toml (open in binary as required by tomllib)
 system_message = ""
 try:
-    with prompt_path.open("rb") as f:
-        prompt_file = tomllib.load(f)
-    system_message = prompt_file.get("prompt", "")
+    prompt_stat = prompt_path.stat()
+    prompt_stamp = (prompt_stat.st_mtime_ns, prompt_stat.st_size)
+    cached_message = _read_prompt_cache(prompt_stamp)
+    if cached_message is not None:
+        system_message = cached_message
+    else:
+        import tomllib
+        with prompt_path.open("rb") as f:
+            prompt_file = tomllib.load(f)
+        system_message = prompt_file.get("prompt", "")
+        _write_prompt_cache(prompt_stamp, system_message)
     if not system_message:
         logger.warning("`prompt.toml` loaded but contains no 'prompt' key or it is empty")
 except FileNotFoundError:
     logger.error(f"prompt.toml not found at {prompt_path}")
-except tomllib.TOMLDecodeError as e:
+except ValueError as e:  # tomllib.TOMLDecodeError
     logger.error(f"Error parsing prompt.toml: {e}")
 except Exception as e:
     logger.error(f"Unexpected error loading prompt.toml: {type(e).__name__}: {e}")
@@ -84,37 +183,52 @@ async def chat(request: RequestObject):
                 detail="Message too long. Maximum 10000 characters allowed."
             )
         
+        # Retrieves the agent, building it if warm-up hasn't finished yet
+        agent = await get_agent_lazy()
+
         # Configures the tread ID as a LangChain runnable
         config: RunnableConfig = {"configurable": {"thread_id": request.threadId}}
 
-        # Sets message history order
-        messages = [
-            SystemMessage(content=system_message),
-            HumanMessage(content=request.prompt.content)
-        ]
+        # Sends only the new user turn: the system prompt is bound to the agent
+        # and earlier turns are restored from the checkpointer by thread ID
+        messages = [HumanMessage(content=request.prompt.content)]
 
         # Asyncronous stream generator
-        async def generate() -> AsyncGenerator[str, None]:
+        async def generate() -> AsyncGenerator[bytes, None]:
             """Async generator yielding streamed chunks from the AI agent.
 
-            Yields string chunks to be forwarded in the StreamingResponse.
+            Yields UTF-8 encoded chunks so the StreamingResponse can write
+            them to the socket without re-encoding each one.
             Exceptions are logged and re-raised to be handled by the caller.
             """
             try:
-                async for event in agent.astream_events(
+                # Token usage summed over every model call in the turn
+                usage = {"input_tokens": 0, "output_tokens": 0, "cache_read": 0}
+
+                # "messages" mode yields only (message chunk, metadata) pairs
+                # instead of an event dict for every graph, tool and parser step
+                async for chunk, _ in agent.astream(
                     {"messages": messages},
-                    config={"configurable": {"thread_id": request.threadId}},
-                    version="v1"
-                ): 
-                    kind = event["event"]
-
-                    # Filters through text events
-                    if kind == "on_chat_model_stream":
-                        chunk = event["data"].get("chunk")
-                        if chunk:
-                            content = chunk.content
-                            if content:
-                                yield content
+                    config=config,
+                    stream_mode="messages"
+                ):
+                    # Filters through AI chunks (tool results are skipped)
+                    if not isinstance(chunk, AIMessageChunk):
+                        continue
+
+                    # The provider reports usage on the last chunk of each model call
+                    if chunk.usage_metadata:
+                        usage["input_tokens"] += chunk.usage_metadata.get("input_tokens", 0)
+                        usage["output_tokens"] += chunk.usage_metadata.get("output_tokens", 0)
+                        usage["cache_read"] += chunk.usage_metadata.get("input_token_details", {}).get("cache_read", 0)
+
+                    if chunk.content:
+                        yield chunk.content.encode("utf-8")
+
+                logger.info(
+                    f"Token usage: input={usage['input_tokens']} "
+                    f"(cached={usage['cache_read']}), output={usage['output_tokens']}"
+                )
 
             except Exception as e:
                 logger.error(f"Error in stream generation: {type(e).__name__}")
@@ -126,14 +240,7 @@ async def chat(request: RequestObject):
         return StreamingResponse(
             generate(),
             media_type='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-active',
-                'X-Accel-Buffering': 'no',
-                'X-Content-Type-Options': 'nosniff',
-                'X-Frame-Options': 'DENY',
-                'X-XSS-Protection': '1; mode=block'
-            }
+            headers=SSE_HEADERS
         )
     except HTTPException:
         raise
@@ -0,0 +1,30 @@
+# Checks how the agent tools are cached in Redis.
+
+import pytest
+
+import tools
+
+@pytest.mark.parametrize("name", tools.__all__)
+def test_every_tool_is_cached(name):
+    if name in tools._CACHED_HELPERS:
+        assert getattr(tools, tools._CACHED_HELPERS[name])._redis_cached
+    else:
+        assert getattr(tools, name).func._redis_cached
+
+def test_get_stock_price_goes_through_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tools, '_cached_stock_price', lambda ticker: calls.append(ticker) or "123.45")
+    assert tools.get_stock_price.invoke({"ticker": " aapl"}) == "123.45"
+    assert calls == ["AAPL"]
+
+def test_web_search_goes_through_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tools, '_cached_web_search', lambda query: calls.append(query) or "{}")
+    assert tools.web_search.invoke({"query": "  NVDA   Earnings "}) == "{}"
+    assert calls == ["nvda earnings"]
+
+def test_cache_keys_share_ticker_casing():
+    key = tools._cache_key('get_balance_sheet', (), {'ticker': 'aapl'})
+    assert key == tools._cache_key('get_balance_sheet', (), {'ticker': 'AAPL'})
+    key = tools._cache_key('get_stock_prices_batch', (), {'tickers': ['aapl', 'msft']})
+    assert key == tools._cache_key('get_stock_prices_batch', (), {'tickers': ['AAPL', 'MSFT']})
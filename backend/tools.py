@@ -1,83 +1,464 @@
 # Creates the tools that the agent will use during execution.
 
-# Imports logging and environment variable importing components
-from dotenv import load_dotenv
+# Imports logging and serialization components (environment variables are loaded by main.py)
 import logging
-import json
-from datetime import datetime
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Callable, Optional
 import hashlib
+import threading
+import time
+import uuid
+from itertools import batched
+import io
+import os
+import orjson
+import zstandard
 
 # Cache and TTL
 import redis
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps, lru_cache
+from cachetools import TTLCache, cached
 
-# Imports the tool components 
-import yfinance as yf
+# Imports the tool components (yfinance and tavily are imported lazily inside
+# the tools, so importing this module doesn't pull in pandas/numpy up front)
 from langchain.tools import tool
-from tavily import TavilyClient
 
-# Environment variable loading and logger config
-load_dotenv()
+# Logger config (messages use %-style arguments, so lines filtered out by the
+# log level are never formatted; per-call cache and news traces log at DEBUG)
 logger = logging.getLogger(__name__)
 
 # === REDIS CACHE ===
+
+# Background refreshes of stale entries, kept off the tool worker threads
+_REFRESH_WORKERS = 4
+_refresh_pool = ThreadPoolExecutor(max_workers=_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+# Connection pool shared by every cached tool: concurrent tool calls each borrow
+# their own connection, so it holds one per tool worker (TOOL_WORKERS, see
+# main.py) and per refresh worker; tight timeouts make a stalled Redis fail
+# fast instead of holding up the agent
+redis_pool = redis.ConnectionPool(
+    host='localhost',
+    port=6379,
+    db=0,
+    decode_responses=False, # bytes, so compressed values round-trip intact
+    max_connections=int(os.getenv('TOOL_WORKERS', "32")) + _REFRESH_WORKERS,
+    socket_timeout=0.2,
+    socket_connect_timeout=0.2,
+    health_check_interval=30
+)
 try:
-    redis_client = redis.Redis(
-        host='localhost',
-        port=6379,
-        db=0,
-        decode_responses=True # str instead of bytes
-    )
+    redis_client = redis.Redis(connection_pool=redis_pool)
     redis_client.ping() # Tests conn
     logger.info("Redis cache connected successfully")
 except Exception as e:
-    logger.warning(f"Redis unavailable, falling back to no cache: {str(e)}")
+    logger.warning("Redis unavailable, falling back to no cache: %s", e)
     redis_client = None
 
+# Cached values: strings are stored as UTF-8, anything else as tagged orjson;
+# payloads over 512 bytes (history CSVs, news and search JSON) are stored
+# zstd-compressed behind a marker byte
+_JSON_TAG = b"\x1ejson:"
+_ZSTD_TAG = b"\x1f"
+_ZSTD_MIN_SIZE = 512
+
+# zstd contexts aren't safe to share between threads, so each tool worker gets its own
+_zstd_local = threading.local()
+
+def _zstd():
+    """Returns this thread's zstd (compressor, decompressor) pair."""
+    pair = getattr(_zstd_local, "pair", None)
+    if pair is None:
+        pair = _zstd_local.pair = (zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor())
+    return pair
+
+def _dump_cached(result) -> bytes:
+    """Serializes a tool result for Redis."""
+    if isinstance(result, str):
+        payload = result.encode()
+    else:
+        payload = _JSON_TAG + orjson.dumps(result)
+    if len(payload) > _ZSTD_MIN_SIZE:
+        return _ZSTD_TAG + _zstd()[0].compress(payload)
+    return payload
+
+def _load_cached(cached: bytes):
+    """Restores a tool result stored by `_dump_cached`."""
+    if cached.startswith(_ZSTD_TAG):
+        cached = _zstd()[1].decompress(cached[1:])
+    if cached.startswith(_JSON_TAG):
+        return orjson.loads(cached[len(_JSON_TAG):])
+    return cached.decode()
+
+# Namespace for every cache key (bump the version on deploys that change a
+# tool's output format, so stale entries are skipped instead of flushed)
+CACHE_PREFIX = "nexus:v2:"
+
+def _normalize_tickers(tickers: list[str]) -> list[str]:
+    """Upper-cases and de-duplicates ticker symbols, keeping the first 8."""
+    return list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))[:8]
+
+# Readable cache key builder
+def _cache_key(name: str, args: tuple, kwargs: dict) -> str:
+    """Builds a `nexus:v2:name:arg:key=value` cache key from a tool call.
+
+    Tickers (and ticker lists) are normalized the way the tools normalize them,
+    so AAPL and aapl share an entry; argument strings longer than 200
+    characters are shortened to a blake2b digest.
+    """
+    parts = [repr(arg) for arg in args]
+    for key, value in sorted(kwargs.items()):
+        if key == 'ticker' and isinstance(value, str):
+            value = value.strip().upper()
+        elif key == 'tickers' and isinstance(value, list):
+            value = _normalize_tickers(value)
+        parts.append(f"{key}={value!r}")
+    raw = ":".join(parts)
+    if len(raw) > 200:
+        raw = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    return f"{CACHE_PREFIX}{name}:{raw}"
+
+# Single-flight locks outlive the slowest upstream call (Tavily's 30s timeout,
+# yfinance's 10s requests with YF_RETRIES backoff), and waiters poll that long
+_LOCK_TTL = 60
+_LOCK_POLL = 0.1
+
+# Deletes a lock only while it still holds the caller's token, so a holder whose
+# lock expired can't release the lock another worker has since taken
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_release_script = redis_client.register_script(_RELEASE_LOCK) if redis_client else None
+
+def _acquire_lock(lock_key: str) -> Optional[str]:
+    """Takes a single-flight lock, returning its owner token (None if already held)."""
+    token = uuid.uuid4().hex
+    return token if redis_client.set(lock_key, token, nx=True, ex=_LOCK_TTL) else None
+
+def _release_lock(lock_key: str, token: str) -> None:
+    """Releases a single-flight lock if the given token still owns it."""
+    _release_script(keys=[lock_key], args=[token])
+
+# L1 caches of every decorated function, by name, for targeted invalidation
+_local_caches: dict[str, tuple[TTLCache, threading.Lock]] = {}
+
 # Redis cache decorator
-def redis_cache(ttl: int):
-    """Redis cache decorator with TTL."""
+def redis_cache(
+    ttl: int,
+    maxsize: int = 256,
+    sliding: bool = False,
+    max_age: int = 0,
+    stale_ttl: int = 0,
+    refresh_if: Optional[Callable[[float], bool]] = None
+):
+    """Two-tier cache decorator with TTL: in-process L1 in front of Redis L2.
+
+    Hot keys are served from a per-tool `TTLCache` without a network hop; its
+    TTL is capped at 30s while Redis is up, so entries refreshed in Redis by
+    other workers aren't shadowed for long. With `sliding=True` every Redis hit
+    also refreshes the key's TTL (a single GETEX round-trip); `max_age` caps
+    that, treating entries fetched more than `max_age` seconds ago as misses.
+    When Redis is unavailable the L1 cache alone keeps results for the full TTL.
+
+    With `stale_ttl` set, Redis keeps entries (stamped with their fetch time)
+    for `stale_ttl` seconds and serves them stale-while-revalidate: an entry
+    older than `ttl` is returned as-is and, if `refresh_if(fetched_at)` allows
+    it, re-fetched in the background by a single worker.
+    """
     def decorator(func):
+        local_ttl = ttl if redis_client is None else min(ttl, 30)
+        local_cache = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        local_lock = threading.Lock()
+        local_get = local_cache.get
+        local_set = local_cache.__setitem__
+        _local_caches[func.__name__] = (local_cache, local_lock)
+
+        def remember(cache_key: str, result):
+            """Stores a result in the L1 cache and returns it."""
+            with local_lock:
+                local_set(cache_key, result)
+            return result
+
+        # Entries are stamped with their fetch time when served stale or age-capped
+        stamped = bool(stale_ttl or max_age)
+
+        def store(cache_key: str, result) -> None:
+            """Writes a result to Redis, stamped with its fetch time if needed."""
+            if stamped:
+                payload = _dump_cached({"v": result, "ts": time.time()})
+            else:
+                payload = _dump_cached(result)
+            redis_client.setex(cache_key, stale_ttl or ttl, payload)
+
+        def unpack(cached: bytes) -> tuple:
+            """Returns the result held in a Redis value and its fetch time (None if unstamped)."""
+            value = _load_cached(cached)
+            if not stamped:
+                return value, None
+            return value["v"], value["ts"]
+
+        def too_old(fetched_at: Optional[float]) -> bool:
+            """Returns whether an entry is past `max_age` and must be re-fetched."""
+            return bool(max_age) and time.time() - fetched_at >= max_age
+
+        def refresh(cache_key: str, args: tuple, kwargs: dict) -> None:
+            """Re-fetches a stale entry, unless another worker already is."""
+            lock_key = f"{cache_key}:lock"
+            try:
+                token = _acquire_lock(lock_key)
+                if token is None:
+                    return
+                try:
+                    result = func(*args, **kwargs)
+                    store(cache_key, result)
+                    remember(cache_key, result)
+                finally:
+                    _release_lock(lock_key, token)
+            except Exception as e:
+                logger.warning("Background refresh error for %s: %s", func.__name__, e)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
+            cache_key = _cache_key(func.__name__, args, kwargs)
+
+            with local_lock:
+                cached_result = local_get(cache_key)
+            if cached_result is not None:
+                logger.debug("Local cache HIT: %s", func.__name__)
+                return cached_result
+
             if redis_client is None:
-                return func(*args, **kwargs)
-            cache_key = f"{func.__name__}:{hashlib.md5(str(args).encode() + str(kwargs).encode()).hexdigest()}"
+                return remember(cache_key, func(*args, **kwargs))
+
             try:
-                cached = redis_client.get(cache_key)
+                if sliding:
+                    cached = redis_client.getex(cache_key, ex=ttl)
+                else:
+                    cached = redis_client.get(cache_key)
                 if cached:
-                    logger.info(f"Cache HIT: {func.__name__}")
-                    return cached
+                    result, fetched_at = unpack(cached)
+                    if not too_old(fetched_at):
+                        logger.debug("Cache HIT: %s", func.__name__)
+                        is_stale = bool(stale_ttl) and time.time() - fetched_at >= ttl
+                        if is_stale and (refresh_if is None or refresh_if(fetched_at)):
+                            _refresh_pool.submit(refresh, cache_key, args, kwargs)
+                        return remember(cache_key, result)
                 
             except Exception as e:
-                logger.warning(f"Redis GET error: {e}")
+                logger.warning("Redis GET error: %s", e)
             
-            logger.info(f"Cache MISS: {func.__name__}")
-            result = func(*args, **kwargs)
+            logger.debug("Cache MISS: %s", func.__name__)
 
+            # Single-flight: the first caller takes a lock and fetches, concurrent
+            # callers poll for its result (for as long as the lock can live)
+            # instead of hitting upstream; they only fetch themselves if the
+            # holder gives up without storing a result
+            lock_key = f"{cache_key}:lock"
+            token = None
             try:
-                redis_client.setex(cache_key, ttl, result)
+                token = _acquire_lock(lock_key)
+                if token is None:
+                    deadline = time.monotonic() + _LOCK_TTL
+                    while time.monotonic() < deadline:
+                        time.sleep(_LOCK_POLL)
+                        # Checked before the read, so a result stored just
+                        # before the lock was released is still picked up
+                        holder_done = not redis_client.exists(lock_key)
+                        cached = redis_client.get(cache_key)
+                        if cached:
+                            result, fetched_at = unpack(cached)
+                            if not too_old(fetched_at):
+                                logger.debug("Cache HIT after wait: %s", func.__name__)
+                                return remember(cache_key, result)
+                        if holder_done:
+                            break
             except Exception as e:
-                logger.warning(f"Redis SET error: {e}")
-            return result
+                logger.warning("Redis lock error: %s", e)
+
+            try:
+                result = func(*args, **kwargs)
+
+                try:
+                    store(cache_key, result)
+                except Exception as e:
+                    logger.warning("Redis SET error: %s", e)
+                return remember(cache_key, result)
+            finally:
+                if token is not None:
+                    try:
+                        _release_lock(lock_key, token)
+                    except Exception as e:
+                        logger.warning("Redis lock release error: %s", e)
+        # Marks the function as cached, so a plain redefinition is easy to spot
+        wrapper._redis_cached = True
         return wrapper
     return decorator
+
+# Tools whose results are cached by a helper they delegate to, by tool name
+_CACHED_HELPERS = {
+    'get_stock_price': '_cached_stock_price',
+    'web_search': '_cached_web_search'
+}
+
+def invalidate(name: str) -> int:
+    """Drops every cached result of one tool or cached function (e.g. `web_search`).
+
+    Keys are found with SCAN and removed with UNLINK in batches, so Redis is
+    never blocked the way KEYS or FLUSHDB would block it; in-flight
+    single-flight locks are left alone. Returns the number of Redis keys removed.
+    """
+    name = _CACHED_HELPERS.get(name, name)
+    local = _local_caches.get(name)
+    if local is not None:
+        local_cache, local_lock = local
+        with local_lock:
+            local_cache.clear()
+
+    if redis_client is None:
+        return 0
+
+    removed = 0
+    keys = (
+        key for key in redis_client.scan_iter(match=f"{CACHE_PREFIX}{name}:*", count=500)
+        if not key.endswith(b":lock")
+    )
+    for batch in batched(keys, 200):
+        removed += redis_client.unlink(*batch)
+    logger.info("Invalidated %s cached entries for %s", removed, name)
+    return removed
+
+# === CLIENTS ===
+
+# yfinance module, imported on first use; it already keeps one pooled HTTP
+# session per process, so only its retry policy for transient errors is set
+@lru_cache(maxsize=1)
+def _yf():
+    """Returns the yfinance module, configured on first call."""
+    import yfinance as yf
+    yf.config.network.retries = int(os.getenv('YF_RETRIES', "2"))
+    return yf
+
+# yfinance Ticker objects, shared for a minute so a workflow calling several
+# tools on the same symbol reuses one instance (the short TTL keeps data that
+# yfinance memoizes on the instance, like fundamentals and news, from going stale)
+@cached(TTLCache(maxsize=128, ttl=60), lock=threading.Lock())
+def _ticker(symbol: str):
+    """Returns a shared `yf.Ticker` for the given symbol."""
+    return _yf().Ticker(symbol)
+
+# Tavily HTTP session, built on first web search and reused afterwards
+# (TavilyClient posts through the module-level requests.post, paying a new
+# connection and TLS handshake per search, so only its settings are reused)
+@lru_cache(maxsize=1)
+def _tavily():
+    """Returns the shared keep-alive Tavily session and its search endpoint."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from tavily import TavilyClient
+    client = TavilyClient()  # Resolves the API key, proxies and auth headers
+    session = requests.Session()
+    session.headers.update(client.headers)
+    if client.proxies:
+        session.proxies.update(client.proxies)
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+    return session, f"{client.base_url}/search"
+
 # === TOOLS ===
 
+# Tools stay synchronous on purpose: the API streams the agent asynchronously,
+# and LangChain runs sync tools in the event loop's thread pool executor, so
+# blocking yfinance/Tavily I/O never stalls the SSE stream or other requests
+
+# US regular trading session (exchange holidays aren't tracked, so on those
+# days prices are still refreshed once stale)
+_MARKET_TZ = ZoneInfo("America/New_York")
+_MARKET_OPEN = dt_time(9, 30)
+_MARKET_CLOSE = dt_time(16, 0)
+
+def _price_outdated(fetched_at: float) -> bool:
+    """Returns whether a price fetched at `fetched_at` (epoch seconds) may have changed since.
+
+    During the regular session any stale price may have moved; outside it a
+    price is outdated only if it was fetched before the last session close.
+    """
+    now = datetime.now(_MARKET_TZ)
+    if now.weekday() < 5 and _MARKET_OPEN <= now.time() < _MARKET_CLOSE:
+        return True
+    last_close = now.replace(hour=_MARKET_CLOSE.hour, minute=_MARKET_CLOSE.minute, second=0, microsecond=0)
+    if now.time() < _MARKET_CLOSE:
+        last_close -= timedelta(days=1)
+    while last_close.weekday() >= 5:
+        last_close -= timedelta(days=1)
+    return fetched_at < last_close.timestamp()
+
+# Cached price lookup (outside trading hours the last price can't change, so
+# cached prices are served for up to an hour; failures raise so they're never cached)
+@redis_cache(ttl=60, stale_ttl=3600, refresh_if=_price_outdated)
+def _cached_stock_price(ticker: str) -> str:
+    """Fetches the latest closing price as a two-decimal string."""
+    stock = _ticker(ticker)
+    # A single 1-day bar is the lightest price request yfinance offers
+    # (fast_info.last_price downloads a full year of daily bars first)
+    price = stock.history(period='1d', actions=False)['Close'].iloc[-1]
+    return f'{price:.2f}'
+
 # Tool: Real-time stock price retrieval
 @tool
-@redis_cache(ttl=60)
 def get_stock_price(ticker: str) -> str:
     """Returns the current closing price for a stock ticker symbol (e.g., AAPL, NVDA)."""
-    logger.info(f"Fetching stock price for ticker: {ticker}")
+    ticker = ticker.strip().upper()
+    logger.info("Fetching stock price for ticker: %s", ticker)
     try:
-        stock = yf.Ticker(ticker)
-        price = stock.history(period='1d')['Close'].iloc[-1]
-        return str(round(price, 2))
+        return _cached_stock_price(ticker)
     except Exception as e:
-        logger.error(f"Error fetching price for {ticker}: {str(e)}")
+        logger.error("Error fetching price for %s: %s", ticker, e)
         return f"Error: Unable to fetch price for {ticker}"
 
+# Tool: Batched real-time price retrieval for several tickers at once
+@tool
+@redis_cache(ttl=60)
+def get_stock_prices_batch(tickers: list[str]) -> str:
+    """Returns the current closing prices for up to 8 ticker symbols in a single request.
+    
+    Prefer this over repeated get_stock_price calls when 2 or more tickers are needed
+    (e.g., comparisons and watchlists). Returns CSV rows of ticker and price
+    (N/A when unavailable).
+    """
+    symbols = _normalize_tickers(tickers)
+    logger.info("Fetching batch stock prices for: %s", ', '.join(symbols))
+
+    if not symbols:
+        return "Ticker,Close\n"
+
+    try:
+        # One download for all symbols instead of one HTTPS round-trip per ticker
+        df = _yf().download(symbols, period='1d', group_by='ticker', threads=True, progress=False)
+
+        # Last non-null close of every ticker in a single pandas reduction
+        closes = {}
+        if not df.empty:
+            closes = df.xs('Close', axis=1, level=1).ffill().iloc[-1].round(2).dropna().to_dict()
+
+        missing = [symbol for symbol in symbols if symbol not in closes]
+        if missing:
+            logger.warning("No batch price data for %s", ', '.join(missing))
+
+        # Compact CSV keeps the tool output (and LLM context) small
+        result = "Ticker,Close\n"
+        result += "".join(
+            f"{symbol},{closes[symbol]:.2f}\n" if symbol in closes else f"{symbol},N/A\n"
+            for symbol in symbols
+        )
+        return result
+    except Exception as e:
+        logger.error("Error fetching batch prices for %s: %s", ', '.join(symbols), e)
+        return f"Error: Unable to fetch prices for {', '.join(symbols)}"
+
 # Tool: Historical stock price retrieval for a given date range
 @tool
 @redis_cache(ttl=43200)
@@ -92,65 +473,94 @@ def get_historical_stock_price(ticker: str, start_date: str, end_date: str, freq
     
     Use 'quarterly' for very long periods (5+ years), 'monthly' for 1-5 years (default), 
     'weekly' for 3-12 months, 'daily' for up to 3 months.
+    
+    Weekly rows are dated by the week-ending Friday. For past ranges, a week or
+    month that runs past end_date is dropped, since its close falls after end_date.
     """
-    logger.info(f"Fetching historical prices: {ticker} ({start_date} to {end_date}, {frequency})")
+    ticker = ticker.strip().upper()
+    logger.info("Fetching historical prices: %s (%s to %s, %s)", ticker, start_date, end_date, frequency)
     
     try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(start=start_date, end=end_date)
+        frequency = frequency.lower()
         
-        if df.empty:
-            return f"No data found for {ticker} in the specified date range."
+        # Request the coarsest bars that cover the frequency, so multi-year
+        # ranges don't download daily rows only to resample them away
+        interval = {"quarterly": "1mo", "monthly": "1mo", "weekly": "1wk"}.get(frequency, "1d")
+        
+        stock = _ticker(ticker)
+        closes = stock.history(start=start_date, end=end_date, interval=interval, actions=False)['Close']
+        
+        # Yahoo returns whole weeks/months, so for a past range ending mid-period
+        # the last bar closes after end_date (exclusive); that partial period is dropped
+        end = date.fromisoformat(end_date)
+        if interval != "1d" and not closes.empty and end < datetime.now(_MARKET_TZ).date():
+            last_period = closes.index[-1].tz_localize(None).to_period('W-FRI' if interval == "1wk" else 'M')
+            if last_period.end_time.date() >= end:
+                closes = closes.iloc[:-1]
         
-        df = df[["Close"]]
+        if closes.empty:
+            return f"No data found for {ticker} in the specified date range."
         
         # Aggregate based on frequency to reduce tokens
-        if frequency.lower() == "quarterly":
-            df_resampled = df.resample('QE').last()
-            df_resampled.index = df_resampled.index.strftime('%Y-Q%q')
+        if frequency == "quarterly":
+            # Hash group-by over the monthly rows (resample would also build
+            # every bin in the span); PeriodIndex supports the %q directive
+            closes = closes.groupby(closes.index.tz_localize(None).to_period('Q')).last()
+            closes.index = closes.index.strftime('%Y-Q%q')
+            date_format = None
             period_label = "Quarterly"
             max_points = 40  # ~10 anos
             
-        elif frequency.lower() == "monthly":
-            df_resampled = df.resample('ME').last()
-            df_resampled.index = df_resampled.index.strftime('%Y-%m')
+        elif frequency == "monthly":
+            # Monthly bars already hold each month's last close
+            date_format = '%Y-%m'
             period_label = "Monthly"
             max_points = 60  # ~5 anos
             
-        elif frequency.lower() == "weekly":
-            df_resampled = df.resample('W-FRI').last()
-            df_resampled.index = df_resampled.index.strftime('%Y-%m-%d')
+        elif frequency == "weekly":
+            # Weekly bars hold each week's last close but are labelled by the
+            # week's Monday, so they're relabelled to the week-ending Friday
+            closes.index = closes.index + timedelta(days=4)
+            date_format = '%Y-%m-%d'
             period_label = "Weekly"
             max_points = 52  # ~1 ano
             
         else:  # daily
-            if len(df) > 90:
-                logger.warning(f"Daily data truncated to last 90 days for {ticker}")
-                df = df.tail(90)
-            df_resampled = df
-            df_resampled.index = df_resampled.index.strftime('%Y-%m-%d')
+            date_format = '%Y-%m-%d'
             period_label = "Daily"
             max_points = 90
         
         # Limitar pontos totais
-        if len(df_resampled) > max_points:
-            logger.warning(f"{period_label} data truncated to last {max_points} points for {ticker}")
-            df_resampled = df_resampled.tail(max_points)
-        
-        df_resampled['Close'] = df_resampled['Close'].round(2)
+        if len(closes) > max_points:
+            logger.warning("%s data truncated to last %s points for %s", period_label, max_points, ticker)
+            closes = closes.iloc[-max_points:]
         
-        # Retornar CSV puro (sem comentários)
-        result = "Date,Close\n"
-        result += df_resampled.to_csv(index=True, header=False)
+        # Retornar CSV puro (sem comentários); pandas formats dates and rounds
+        # prices while writing, so no reformatted index or rounded copy is built
+        buf = io.StringIO()
+        buf.write("Date,Close\n")
+        closes.to_csv(buf, header=False, date_format=date_format, float_format='%.2f')
+        result = buf.getvalue()
         
-        logger.info(f"Returned {len(df_resampled)} {period_label.lower()} data points for {ticker}")
+        logger.info("Returned %s %s data points for %s", len(closes), period_label.lower(), ticker)
         return result
         
     except Exception as e:
-        logger.error(f"Error fetching history for {ticker}: {str(e)}")
+        logger.error("Error fetching history for %s: %s", ticker, e)
         return f"Error: Unable to fetch historical data for {ticker}"
 
 
+# Balance sheet rows returned by get_balance_sheet, in output order
+_BALANCE_KEY_ITEMS = (
+    'Total Assets',
+    'Total Liabilities Net Minority Interest',
+    'Stockholders Equity',
+    'Current Assets',
+    'Current Liabilities',
+    'Cash And Cash Equivalents',
+    'Total Debt'
+)
+
 # Tool: Retrieve a company's balance sheet data
 @tool
 @redis_cache(ttl=86400)
@@ -160,99 +570,107 @@ def get_balance_sheet(ticker: str) -> str:
     Includes: Total Assets, Total Liabilities, Stockholders Equity, Current Assets, 
     Current Liabilities, Cash, Total Debt. Optimized for streaming responses.
     """
-    logger.info(f"Fetching balance sheet for ticker: {ticker}")
+    ticker = ticker.strip().upper()
+    logger.info("Fetching balance sheet for ticker: %s", ticker)
 
     try: 
-        stock = yf.Ticker(ticker)
+        stock = _ticker(ticker)
         df = stock.balance_sheet.iloc[:, :3]  # Last 3 years
         
-        # Key metrics only - reduces tokens significantly
-        key_items = [
-            'Total Assets', 
-            'Total Liabilities Net Minority Interest',
-            'Stockholders Equity', 
-            'Current Assets', 
-            'Current Liabilities',
-            'Cash And Cash Equivalents',
-            'Total Debt'
-        ]
+        # Key metrics only - reduces tokens significantly (one reindex pass;
+        # metrics the company doesn't report come back empty and are dropped)
+        df_filtered = df.reindex(_BALANCE_KEY_ITEMS).dropna(how='all')
         
-        available_items = df.index.intersection(key_items)
-        
-        if len(available_items) > 0:
-            df_filtered = df.loc[available_items]
+        if not df_filtered.empty:
             result = f"{ticker} Balance Sheet (Key Metrics)\n"
-            result += df_filtered.to_csv()
+            result += df_filtered.to_csv(float_format='%.0f')
             return result
         else:
             # Fallback to top items
-            logger.warning(f"Standard metrics not found for {ticker}, using top 8 rows")
+            logger.warning("Standard metrics not found for %s, using top 8 rows", ticker)
             result = f"{ticker} Balance Sheet (Top Metrics)\n"
-            result += df.head(8).to_csv()
+            result += df.head(8).to_csv(float_format='%.0f')
             return result
             
     except Exception as e:
-        logger.error(f"Error fetching balance sheet for {ticker}: {str(e)}")
+        logger.error("Error fetching balance sheet for %s: %s", ticker, e)
         return f"Error: Unable to fetch balance sheet for {ticker}"
 
-# Tool: Retrieve recent news for a stock
+# News timestamps repeat across adjacent ticker queries, so parsed dates are memoized
+@lru_cache(maxsize=1024)
+def _parse_news_date(ts) -> str:
+    """Formats a news timestamp (epoch seconds or ISO 8601 string) as YYYY-MM-DD."""
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts).strftime('%Y-%m-%d')
+        except ValueError:
+            return ts[:10] if len(ts) >= 10 else "N/A"
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+
+# News item fields, probed in order (yfinance 1.0 nests them under 'content',
+# where the publisher and link are objects holding displayName and url)
+_TS_FIELDS = ('providerPublishTime', 'publishTime', 'timestamp', 'pubDate')
+_TITLE_FIELDS = ('title', 'headline')
+_PUB_FIELDS = ('publisher', 'source', 'provider')
+_LINK_FIELDS = ('link', 'url', 'canonicalUrl', 'clickThroughUrl')
+
+def _first_field(item: dict, fields: tuple, default=None):
+    """Returns the first non-empty value among `fields`, unwrapping nested objects."""
+    value = next((item[k] for k in fields if item.get(k)), default)
+    if isinstance(value, dict):
+        value = value.get('displayName') or value.get('url') or default
+    return value
+
+# Tool: Retrieve recent news for a stock (sliding TTL, refetched at least every 2 hours)
 @tool
-@redis_cache(ttl=3600)
+@redis_cache(ttl=3600, sliding=True, max_age=7200)
 def get_stock_news(ticker: str) -> str:
     """Returns the 5 most recent news articles for a stock ticker.
     
     Returns JSON with title, publisher, link, and publish date. Stream-optimized format.
     """
-    logger.info(f"Fetching news for ticker: {ticker}")
+    ticker = ticker.strip().upper()
+    logger.info("Fetching news for ticker: %s", ticker)
     try:
-        stock = yf.Ticker(ticker)
+        stock = _ticker(ticker)
         
         # Tentar pegar news de múltiplas fontes
         raw_news = None
         try:
             raw_news = stock.news
-            logger.info(f"Got {len(raw_news) if raw_news else 0} news items from stock.news")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Got %s news items from stock.news", len(raw_news) if raw_news else 0)
         except Exception as e:
-            logger.warning(f"stock.news failed: {e}")
+            logger.warning("stock.news failed: %s", e)
         
         # Fallback: tentar .get_news() se disponível
         if not raw_news:
             try:
                 raw_news = stock.get_news()
-                logger.info(f"Got {len(raw_news) if raw_news else 0} news items from get_news()")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Got %s news items from get_news()", len(raw_news) if raw_news else 0)
             except Exception as e:
-                logger.warning(f"get_news() failed: {e}")
+                logger.warning("get_news() failed: %s", e)
         
         # Se ainda não tem news, retornar vazio
         if not raw_news or len(raw_news) == 0:
-            logger.warning(f"No news found for {ticker}")
-            return json.dumps({"ticker": ticker, "articles": []})
+            logger.warning("No news found for %s", ticker)
+            return orjson.dumps({"ticker": ticker, "articles": []}).decode()
 
         clean_news = []
         for n in raw_news[:5]:
             try:
+                n = n.get('content') or n
+
                 # Tentar múltiplos campos de timestamp
-                ts = n.get('providerPublishTime') or n.get('publishTime') or n.get('timestamp')
+                ts = _first_field(n, _TS_FIELDS)
                 
-                if ts:
-                    # Se timestamp é string, tentar converter
-                    if isinstance(ts, str):
-                        try:
-                            from dateutil import parser
-                            dt = parser.parse(ts)
-                            date_str = dt.strftime('%Y-%m-%d')
-                        except:
-                            date_str = ts[:10] if len(ts) >= 10 else "N/A"
-                    else:
-                        # Timestamp numérico
-                        date_str = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
-                else:
-                    date_str = "N/A"
+                date_str = _parse_news_date(ts) if ts else "N/A"
                 
                 # Extrair campos com fallbacks
-                title = n.get('title') or n.get('headline') or 'No title'
-                publisher = n.get('publisher') or n.get('source') or 'Unknown'
-                link = n.get('link') or n.get('url') or ''
+                title = _first_field(n, _TITLE_FIELDS, 'No title')
+                publisher = _first_field(n, _PUB_FIELDS, 'Unknown')
+                link = _first_field(n, _LINK_FIELDS, '')
                 
                 clean_news.append({
                     "title": str(title)[:90],
@@ -262,66 +680,80 @@ def get_stock_news(ticker: str) -> str:
                 })
                 
             except Exception as e:
-                logger.warning(f"Error parsing news item: {e}")
+                logger.warning("Error parsing news item: %s", e)
                 continue
         
         if not clean_news:
-            logger.warning(f"No parseable news for {ticker}")
-            return json.dumps({"ticker": ticker, "articles": []})
+            logger.warning("No parseable news for %s", ticker)
+            return orjson.dumps({"ticker": ticker, "articles": []}).decode()
         
-        logger.info(f"Returning {len(clean_news)} news articles for {ticker}")
-        return json.dumps({
+        logger.info("Returning %s news articles for %s", len(clean_news), ticker)
+        return orjson.dumps({
             "ticker": ticker,
             "articles": clean_news
-        })
+        }).decode()
         
     except Exception as e:
-        logger.error(f"Error fetching news for {ticker}: {str(e)}")
-        return json.dumps({"ticker": ticker, "articles": [], "error": str(e)[:50]})
+        logger.error("Error fetching news for %s: %s", ticker, e)
+        return orjson.dumps({"ticker": ticker, "articles": [], "error": str(e)[:50]}).decode()
+
+# Cached Tavily search, keyed by the normalized query (failures raise so they're
+# never cached; sliding TTL, refetched at least every 30 minutes)
+@redis_cache(ttl=600, maxsize=512, sliding=True, max_age=1800)
+def _cached_web_search(query: str) -> str:
+    """Runs a Tavily search and returns the top 3 results as JSON."""
+    session, search_url = _tavily()
+    response = session.post(
+        search_url,
+        data=orjson.dumps({"query": query, "search_depth": "basic", "max_results": 3}),
+        timeout=30
+    )
+    response.raise_for_status()
+    response = orjson.loads(response.content)
+    
+    # Extract and limit content for efficient streaming
+    results = []
+    for item in response.get('results', [])[:3]:
+        results.append({
+            'title': item.get('title', 'No title')[:100],
+            'snippet': item.get('content', 'No content')[:250],  # Reduced to 250 chars
+            'url': item.get('url', ''),
+            'relevance': round(item.get('score', 0), 2)
+        })
+    
+    return orjson.dumps({
+        "query": query,
+        "results": results,
+        "count": len(results)
+    }).decode()
 
 # Tool: Perform web search requests via the Tavily API
 @tool
-@redis_cache(ttl=60)
 def web_search(query: str) -> str:
     """Performs web search and returns top 3 results with title, snippet, and URL.
     
     Useful for recent market news, company information, earnings reports, and financial analysis.
     Results are optimized for streaming responses.
     """
-    logger.info(f"Web search: {query[:60]}...")
+    logger.info("Web search: %s...", query[:60])
     
     try:
-        tavily_client = TavilyClient()
-        response = tavily_client.search(query, search_depth="basic", max_results=3)
-        
-        # Extract and limit content for efficient streaming
-        results = []
-        for item in response.get('results', [])[:3]:
-            results.append({
-                'title': item.get('title', 'No title')[:100],
-                'snippet': item.get('content', 'No content')[:250],  # Reduced to 250 chars
-                'url': item.get('url', ''),
-                'relevance': round(item.get('score', 0), 2)
-            })
-        
-        return json.dumps({
-            "query": query,
-            "results": results,
-            "count": len(results)
-        }, indent=2)
+        # Collapses whitespace and case so repeated queries share one cache entry
+        return _cached_web_search(" ".join(query.split()).lower())
         
     except Exception as e:
-        logger.error(f"Web search error for '{query}': {str(e)}")
-        return json.dumps({
+        logger.error("Web search error for '%s': %s", query, e)
+        return orjson.dumps({
             "query": query,
             "error": "Search failed",
             "results": []
-        })
+        }).decode()
 
 
 # Export all tools for easy import
 __all__ = [
     'get_stock_price',
+    'get_stock_prices_batch',
     'get_historical_stock_price', 
     'get_balance_sheet',
     'get_stock_news',